@@ -19,6 +19,88 @@ class StoreConfigNorm(TypedDict):
     database: str
 
 
+class AdaptiveGenerationConfig(TypedDict):
+    """Type definition."""
+
+    enabled: NotRequired[bool]
+    target_time: NotRequired[float]
+    min_individuals: NotRequired[int]
+    smoothing: NotRequired[float]
+
+
+class AdaptiveGenerationConfigNorm(TypedDict):
+    """Type definition."""
+
+    enabled: bool
+    target_time: float
+    min_individuals: int
+    smoothing: float
+
+
+class DrainConfig(TypedDict):
+    """Type definition."""
+
+    stop_timeout: NotRequired[float]
+    terminate_timeout: NotRequired[float]
+    kill_timeout: NotRequired[float]
+
+
+class DrainConfigNorm(TypedDict):
+    """Type definition."""
+
+    stop_timeout: float
+    terminate_timeout: float
+    kill_timeout: float
+
+
+class EventLogConfig(TypedDict):
+    """Type definition."""
+
+    enabled: NotRequired[bool]
+    folder: NotRequired[str]
+    max_file_size: NotRequired[int]
+    buffer_size: NotRequired[int]
+    batch_size: NotRequired[int]
+
+
+class EventLogConfigNorm(TypedDict):
+    """Type definition."""
+
+    enabled: bool
+    folder: str
+    max_file_size: int
+    buffer_size: int
+    batch_size: int
+
+
+class ReconnectConfig(TypedDict):
+    """Type definition."""
+
+    stagger_window: NotRequired[float]
+
+
+class ReconnectConfigNorm(TypedDict):
+    """Type definition."""
+
+    stagger_window: float
+
+
+class TelemetryConfig(TypedDict):
+    """Type definition."""
+
+    enabled: NotRequired[bool]
+    interval: NotRequired[float]
+    report_interval: NotRequired[float]
+
+
+class TelemetryConfigNorm(TypedDict):
+    """Type definition."""
+
+    enabled: bool
+    interval: float
+    report_interval: float
+
+
 class WorkerConfig(TypedDict):
     """Type definition."""
 
@@ -30,6 +112,11 @@ class WorkerConfig(TypedDict):
     microbiome: NotRequired[StoreConfig]
     gene_pool: NotRequired[StoreConfig]
     databases: NotRequired[dict[str, DatabaseConfig]]
+    event_log: NotRequired[EventLogConfig]
+    reconnect: NotRequired[ReconnectConfig]
+    drain: NotRequired[DrainConfig]
+    telemetry: NotRequired[TelemetryConfig]
+    adaptive_generation: NotRequired[AdaptiveGenerationConfig]
 
 
 class WorkerConfigNorm(TypedDict):
@@ -43,3 +130,8 @@ class WorkerConfigNorm(TypedDict):
     microbiome: StoreConfigNorm
     gene_pool: StoreConfigNorm
     databases: dict[str, DatabaseConfigNorm]
+    event_log: EventLogConfigNorm
+    reconnect: ReconnectConfigNorm
+    drain: DrainConfigNorm
+    telemetry: TelemetryConfigNorm
+    adaptive_generation: AdaptiveGenerationConfigNorm
@@ -4,10 +4,12 @@ from copy import deepcopy
 from json import dump, load
 from logging import Logger, NullHandler, getLogger
 from os import W_OK, access, chdir, cpu_count, getcwd
-from os.path import dirname, exists, join
+from os.path import exists, join
 from pathlib import Path
+from random import uniform
 from sys import argv
 from sys import exit as sys_exit
+from time import sleep
 from typing import Any, Iterator, cast
 from uuid import UUID, uuid4
 
@@ -26,13 +28,14 @@ from pypgtable import __name__ as pypgtable_name
 from pypgtable import table
 from pypgtable.common import connection_str_from_config
 from pypgtable.pypgtable_typing import TableConfigNorm
-from pypgtable.validators import table_config_validator
 from requests import Response, get
 
 from .config_validator import dump_config, generate_config, load_config
 from .egp_typing import WorkerConfigNorm
 from .platform_info import get_platform_info
+from .schema_cache import table_schema
 from .subprocess_evolution import evolve
+from .telemetry import heartbeat
 
 _logger: Logger = getLogger(__name__)
 _logger.addHandler(NullHandler())
@@ -166,6 +169,9 @@ def launch_worker(args: Namespace) -> None:
         with open(problem_definitions_file, "r", encoding="utf8") as file_ptr:
             problem_definitions = load(file_ptr)
 
+    # Spread the database connections of workers (re)started together
+    sleep(uniform(0.0, config["reconnect"]["stagger_window"]))
+
     # Get the population configurations & set the worker ID
     worker_id: UUID = uuid4()
     _logger.info(f"Worker ID: {worker_id}")
@@ -195,12 +201,7 @@ def launch_worker(args: Namespace) -> None:
     pi_table_config["table"] = gp_config["gene_pool"]["table"] + "_platform_info"
     pi_table_config["database"] = gp_config["gene_pool"]["database"]
     pi_table_config["create_db"] = False
-    with open(
-        join(dirname(__file__), "formats/platform_info_table_format.json"),
-        "r",
-        encoding="utf8",
-    ) as file_ptr:
-        pi_table_config["schema"] = {k: table_config_validator.normalized(v) for k, v in load(file_ptr).items()}
+    pi_table_config["schema"] = table_schema("platform_info_table_format.json")
     pi_data: dict[str, Any] = get_platform_info(pi_table_config)
 
     # Register the worker.
@@ -210,8 +211,7 @@ def launch_worker(args: Namespace) -> None:
     w_table_config["table"] = gp_config["gene_pool"]["table"] + "_workers"
     w_table_config["database"] = gp_config["gene_pool"]["database"]
     w_table_config["create_db"] = False
-    with open(join(dirname(__file__), "formats/worker_table_format.json"), "r", encoding="utf8") as file_ptr:
-        w_table_config["schema"] = {k: table_config_validator.normalized(v) for k, v in load(file_ptr).items()}
+    w_table_config["schema"] = table_schema("worker_table_format.json")
     w_table: table = table(w_table_config)
     num_cores: int | None = cpu_count()
     sub_processes: int = 0 if num_cores is None or num_cores == 1 else num_cores - 1
@@ -227,8 +227,30 @@ def launch_worker(args: Namespace) -> None:
     w_table.insert([w_data])
     _logger.info(f"Worker {worker_id} registered & configured.")
 
+    # Start the heartbeat.
+    # The worker telemetry is persisted in the gene pool database
+    telemetry: heartbeat | None = None
+    if config["telemetry"]["enabled"]:
+        wt_table_config: TableConfigNorm = deepcopy(w_table_config)
+        wt_table_config["table"] = gp_config["gene_pool"]["table"] + "_worker_telemetry"
+        wt_table_config["schema"] = table_schema("worker_telemetry_table_format.json")
+        table(wt_table_config)
+        telemetry = heartbeat(worker_id, wt_table_config["database"], wt_table_config["table"], config["telemetry"])
+        telemetry.start()
+
     # Start the worker
-    evolve(list(p_configs.values()), gpool, w_data["sub_processes"])
+    evolve(
+        list(p_configs.values()),
+        gpool,
+        w_data["sub_processes"],
+        config["event_log"],
+        telemetry,
+        config["adaptive_generation"],
+        config["reconnect"]["stagger_window"],
+        drain_config=config["drain"],
+    )
+    if telemetry is not None:
+        telemetry.stop()
 
     # Return whence we came
     chdir(cwd)
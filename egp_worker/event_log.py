@@ -0,0 +1,187 @@
+"""Streaming generation event log for Erasmus GP.
+
+Generation events (lineage, fitness deltas & pGC outcomes) are appended to a bounded
+in-memory queue by the evolution loop and written out by a background thread as
+Arrow IPC stream files rotated by size. The evolution loop never blocks: if the queue
+is full the event is dropped and counted. Events in a batch that cannot be written (e.g.
+the disk is full) are counted as lost and the writer carries on with a new file.
+"""
+from logging import Logger, NullHandler, getLogger
+from os import getpid
+from os.path import join
+from pathlib import Path
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from time import time
+from typing import TYPE_CHECKING, Any
+
+from numpy import single
+
+from .egp_typing import EventLogConfigNorm
+
+# pyarrow is optional: without it the event log is disabled.
+if TYPE_CHECKING:
+    from pyarrow import OSFile, RecordBatch, Schema, float32, float64, int32, int64, schema
+    from pyarrow.ipc import RecordBatchStreamWriter
+
+    _PYARROW_AVAILABLE: bool = True
+else:
+    try:
+        from pyarrow import OSFile, RecordBatch, float32, float64, int32, int64, schema
+        from pyarrow.ipc import RecordBatchStreamWriter
+
+        _PYARROW_AVAILABLE = True
+    except ImportError:
+        _PYARROW_AVAILABLE = False
+
+
+_logger: Logger = getLogger(__name__)
+_logger.addHandler(NullHandler())
+
+
+# Event columns in the order they are passed to event_log.record()
+EVENT_COLUMNS: tuple[str, ...] = (
+    "time",
+    "population_uid",
+    "parent_ref",
+    "offspring_ref",
+    "pgc_ref",
+    "parent_fitness",
+    "offspring_fitness",
+    "delta_fitness",
+)
+_EVENT_SCHEMA: "Schema | None" = (
+    schema(
+        [
+            ("time", float64()),
+            ("population_uid", int32()),
+            ("parent_ref", int64()),
+            ("offspring_ref", int64()),
+            ("pgc_ref", int64()),
+            ("parent_fitness", float32()),
+            ("offspring_fitness", float32()),
+            ("delta_fitness", float32()),
+        ]
+    )
+    if _PYARROW_AVAILABLE
+    else None
+)
+
+
+# Maximum time in seconds a partial batch is held before being written
+_FLUSH_INTERVAL = 5.0
+
+
+class event_log:
+    """Append-only generation event stream.
+
+    Args
+    ----
+    config: The normalized event log configuration.
+    """
+
+    def __init__(self, config: EventLogConfigNorm) -> None:
+        self.enabled: bool = config["enabled"] and _PYARROW_AVAILABLE
+        if config["enabled"] and not _PYARROW_AVAILABLE:
+            _logger.warning("pyarrow is not installed. The generation event log is disabled.")
+        self.dropped: int = 0
+        self.lost: int = 0
+        self._folder: str = config["folder"]
+        self._max_file_size: int = config["max_file_size"]
+        self._batch_size: int = config["batch_size"]
+        self._queue: Queue[tuple[Any, ...]] = Queue(config["buffer_size"])
+        self._stop: Event = Event()
+        self._file_count: int = 0
+        self._sink: OSFile | None = None
+        self._ipc_writer: RecordBatchStreamWriter | None = None
+        self._thread: Thread | None = None
+        if self.enabled:
+            Path(self._folder).mkdir(parents=True, exist_ok=True)
+            self._thread = Thread(target=self._writer, name="egp_event_log", daemon=True)
+            self._thread.start()
+
+    def record(
+        self,
+        population_uid: int,
+        parent_ref: int,
+        offspring_ref: int | None,
+        pgc_ref: int,
+        parent_fitness: float | single,
+        offspring_fitness: float | single | None,
+        delta_fitness: float | single,
+    ) -> None:
+        """Record a generation event. Never blocks."""
+        if self.enabled:
+            try:
+                self._queue.put_nowait(
+                    (time(), population_uid, parent_ref, offspring_ref, pgc_ref, parent_fitness, offspring_fitness, delta_fitness)
+                )
+            except Full:
+                self.dropped += 1
+
+    def close(self) -> None:
+        """Flush any queued events & stop the writer thread."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            if self.dropped:
+                _logger.warning(f"{self.dropped} generation events were dropped as the event log buffer was full.")
+            if self.lost:
+                _logger.warning(f"{self.lost} generation events were lost as they could not be written.")
+
+    def _next_filename(self) -> str:
+        self._file_count += 1
+        return join(self._folder, f"events_{getpid()}_{int(time())}_{self._file_count:06d}.arrow")
+
+    def _write(self, batch: list[tuple[Any, ...]]) -> None:
+        """Write a batch of events rotating the file if it has reached the maximum size.
+
+        If the batch cannot be written its events are counted as lost & the file is abandoned
+        so that the next batch is written to a new file.
+        """
+        sink = self._sink
+        ipc_writer = self._ipc_writer
+        try:
+            if ipc_writer is None or sink is None:
+                sink = OSFile(self._next_filename(), "wb")
+                ipc_writer = RecordBatchStreamWriter(sink, _EVENT_SCHEMA)
+            columns: dict[str, list[Any]] = {name: list(column) for name, column in zip(EVENT_COLUMNS, zip(*batch))}
+            ipc_writer.write_batch(RecordBatch.from_pydict(columns, schema=_EVENT_SCHEMA))
+            if sink.tell() < self._max_file_size:
+                self._sink, self._ipc_writer = sink, ipc_writer
+                return
+            ipc_writer.close()
+            sink.close()
+        except OSError as exception:
+            if not self.lost:
+                _logger.warning(f"Failed to write generation events: {exception}. Further losses are reported on close.")
+            self.lost += len(batch)
+            if sink is not None and not sink.closed:
+                sink.close()
+        self._sink = self._ipc_writer = None
+
+    def _writer(self) -> None:
+        """Drain the queue to rotated Arrow IPC stream files."""
+        batch: list[tuple[Any, ...]] = []
+        last_flush: float = time()
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                batch.append(self._queue.get(timeout=0.5))
+            except Empty:
+                pass
+            if batch and (len(batch) >= self._batch_size or time() - last_flush > _FLUSH_INTERVAL):
+                self._write(batch)
+                batch = []
+                last_flush = time()
+        if batch:
+            self._write(batch)
+        sink = self._sink
+        ipc_writer = self._ipc_writer
+        if ipc_writer is not None and sink is not None:
+            try:
+                ipc_writer.close()
+            except OSError as exception:
+                _logger.warning(f"Failed to close the generation event file: {exception}")
+            sink.close()
+            self._ipc_writer = self._sink = None
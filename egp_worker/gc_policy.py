@@ -0,0 +1,137 @@
+"""Managed cyclic garbage collection for evolution sub-processes.
+
+Sub-processes are forked with automatic garbage collection disabled and the objects inherited
+from the worker process frozen (moved to the permanent generation) so that they are never
+traversed, keeping the copy-on-write pages shared. Without collection cyclic garbage from xGC
+objects accumulates until available memory runs low. The policy here collects only at generation
+boundaries so there are no pauses mid-generation. Every collection is timed. The young generation
+threshold is tuned from the observed cost per allocation of the young & middle collections, so that
+neither pause exceeds the target, and from the allocation rate, so that garbage is held for no more
+than about the collection interval. The pause of a full collection depends on the size of the heap
+rather than the threshold so a full collection that overran the target defers the following ones
+(which are made as middle collections instead) to keep the full collection pause time per scheduled
+full collection approximately the target. Frozen objects are never unfrozen and so are untouched by
+these collections.
+"""
+from gc import collect, get_count
+from logging import DEBUG, Logger, NullHandler, getLogger
+from time import perf_counter
+
+from .telemetry import reporter
+
+_logger: Logger = getLogger(__name__)
+_logger.addHandler(NullHandler())
+_LOG_DEBUG: bool = _logger.isEnabledFor(DEBUG)
+
+
+# Target collection pause in seconds
+_TARGET_PAUSE = 0.05
+# Target time in seconds between collections at the observed allocation rate
+_COLLECTION_INTERVAL = 1.0
+# Bounds of the young generation threshold (net tracked allocations)
+_MIN_THRESHOLD = 1000
+_MAX_THRESHOLD = 10000000
+_INITIAL_THRESHOLD = 100000
+# As CPython: every 10th young collection is a middle collection & every 10th middle collection is full
+_GENERATION_RATIO = 10
+# Weight of the latest collection in the moving averages of the cost per allocation & allocation rate
+_SMOOTHING = 0.25
+
+
+def _smooth(average: float | None, value: float) -> float:
+    """Exponential moving average."""
+    return value if average is None else average + _SMOOTHING * (value - average)
+
+
+class gc_policy:
+    """Collect cyclic garbage at generation boundaries.
+
+    Args
+    ----
+    report: The telemetry reporter collection pauses are reported to.
+    target_pause: The target collection pause in seconds.
+    collection_interval: The target time in seconds between collections.
+    """
+
+    def __init__(
+        self, report: reporter | None = None, target_pause: float = _TARGET_PAUSE, collection_interval: float = _COLLECTION_INTERVAL
+    ) -> None:
+        self.threshold: int = _INITIAL_THRESHOLD
+        self._report: reporter | None = report
+        self._target_pause: float = target_pause
+        self._collection_interval: float = collection_interval
+        # Young & middle collection cost per allocation
+        self._cost: list[float | None] = [None, None]
+        self._rate: float | None = None
+        self._full_pause: float = 0.0
+        self._deferred_full_collections: int = 0
+        self._young_collections: int = 0
+        self._middle_collections: int = 0
+        self._last_collection: float = perf_counter()
+
+    def boundary(self) -> float:
+        """Collect if enough objects have been allocated since the last collection.
+
+        Returns the collection pause in seconds (0.0 if no collection was made).
+        """
+        allocations: int = get_count()[0]
+        if allocations < self.threshold:
+            return 0.0
+
+        generation: int = self._generation()
+        start: float = perf_counter()
+        unreachable: int = collect(generation)
+        pause: float = perf_counter() - start
+        self._tune(generation, allocations, start - self._last_collection, pause)
+        self._last_collection = start + pause
+        if _LOG_DEBUG:
+            _logger.debug(
+                f"Generation {generation} collection of {allocations} allocations found {unreachable} unreachable"
+                f" objects in {pause:.6f}s. Young threshold {self.threshold}."
+            )
+        if self._report is not None:
+            self._report.record_gc(pause)
+        return pause
+
+    def _generation(self) -> int:
+        """The generation to collect.
+
+        A scheduled full collection is deferred, as a middle collection, once for every whole
+        multiple of the target the previous full collection pause overran by.
+        """
+        self._young_collections += 1
+        if self._young_collections < _GENERATION_RATIO:
+            return 0
+        self._young_collections = 0
+        self._middle_collections += 1
+        if self._middle_collections < _GENERATION_RATIO:
+            return 1
+        self._middle_collections = 0
+        if self._deferred_full_collections < int(self._full_pause / self._target_pause):
+            self._deferred_full_collections += 1
+            return 1
+        self._deferred_full_collections = 0
+        return 2
+
+    def _tune(self, generation: int, allocations: int, interval: float, pause: float) -> None:
+        """Tune the young generation threshold from a collection.
+
+        Args
+        ----
+        generation: The generation collected.
+        allocations: The net tracked allocations since the last collection.
+        interval: The time in seconds from the end of the last collection to the start of this one.
+        pause: The collection pause in seconds.
+        """
+        if generation == 2:
+            self._full_pause = pause
+        else:
+            self._cost[generation] = _smooth(self._cost[generation], pause / allocations)
+        if interval > 0.0:
+            self._rate = _smooth(self._rate, allocations / interval)
+
+        limits: list[float] = [self._target_pause / cost for cost in self._cost if cost]
+        if self._rate is not None:
+            limits.append(self._rate * self._collection_interval)
+        if limits:
+            self.threshold = min(_MAX_THRESHOLD, max(_MIN_THRESHOLD, int(min(limits))))
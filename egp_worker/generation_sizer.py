@@ -0,0 +1,83 @@
+"""Adaptive active population sizing for Erasmus GP.
+
+When enabled the number of active individuals evolved in a generation is chosen so that
+the generation takes approximately the configured target wall-time. The cost of evolving
+an individual is estimated per population with an exponentially weighted moving average
+of the measured generation times. The subset evolved is a window into the active individuals
+that rotates from one generation to the next so every active individual is evolved in turn.
+Each evolution process starts its windows at a different phase so that processes evolving
+the same population in the same epoch do not all evolve the same individuals.
+"""
+from logging import DEBUG, Logger, NullHandler, getLogger
+from typing import Sequence, TypeVar
+
+from .egp_typing import AdaptiveGenerationConfigNorm
+
+_logger: Logger = getLogger(__name__)
+_logger.addHandler(NullHandler())
+_LOG_DEBUG: bool = _logger.isEnabledFor(DEBUG)
+
+
+_T = TypeVar("_T")
+
+
+class generation_sizer:
+    """Choose the individuals to evolve in a generation.
+
+    Args
+    ----
+    config: The adaptive generation configuration.
+    phase: Where, as a fraction of the active individuals, the first window of each population starts.
+    """
+
+    def __init__(self, config: AdaptiveGenerationConfigNorm, phase: float = 0.0) -> None:
+        self.enabled: bool = config["enabled"]
+        self._target_time: float = config["target_time"]
+        self._min_individuals: int = config["min_individuals"]
+        self._smoothing: float = config["smoothing"]
+        self._cost: dict[int, float] = {}
+        self._last_size: dict[int, int] = {}
+        self._offset: dict[int, int] = {}
+        self._phase: float = phase
+
+    def size(self, population_uid: int, available: int) -> int:
+        """Return the number of the available active individuals to evolve.
+
+        Until the cost of an individual has been measured only the minimum number of individuals
+        are evolved. Thereafter the size at most doubles from one generation to the next to limit
+        the impact of a poor estimate.
+        """
+        if not self.enabled:
+            return available
+        cost: float | None = self._cost.get(population_uid)
+        if cost is None:
+            return min(available, self._min_individuals)
+        target: int = int(self._target_time / cost) if cost > 0.0 else available
+        size: int = min(available, max(self._min_individuals, target), 2 * self._last_size.get(population_uid, available))
+        if _LOG_DEBUG:
+            _logger.debug(f"Population {population_uid}: {cost:.6f}s per individual. Evolving {size} of {available} individuals.")
+        return size
+
+    def select(self, population_uid: int, individuals: Sequence[_T]) -> Sequence[_T]:
+        """Return the individuals to evolve this generation.
+
+        The selection is size() individuals starting where the last generation of the
+        population finished (or at the phase for the first generation), wrapping around
+        the end of the sequence.
+        """
+        available: int = len(individuals)
+        size: int = self.size(population_uid, available)
+        if size >= available:
+            return individuals
+        offset: int = self._offset.setdefault(population_uid, int(self._phase * available)) % available
+        return [individuals[(offset + idx) % available] for idx in range(size)]
+
+    def update(self, population_uid: int, duration: float, evolved: int) -> None:
+        """Update the cost estimate with a generation that evolved individuals in duration seconds."""
+        if not self.enabled or evolved <= 0:
+            return
+        self._offset[population_uid] = self._offset.get(population_uid, 0) + evolved
+        self._last_size[population_uid] = evolved
+        cost: float = duration / evolved
+        previous: float | None = self._cost.get(population_uid)
+        self._cost[population_uid] = cost if previous is None else previous + self._smoothing * (cost - previous)
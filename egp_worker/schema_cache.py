@@ -0,0 +1,80 @@
+"""Cache of normalized table schemas.
+
+Normalizing the table schemas in egp_worker/formats with the pypgtable table config validator is
+relatively expensive and the result only changes if the format file or pypgtable changes. Normalized
+schemas are cached on disk keyed by the SHA256 of the format file & the pypgtable version so that
+subsequent worker starts load them pre-normalized. They are also cached in memory for the life of the
+process.
+"""
+from copy import deepcopy
+from functools import lru_cache
+from hashlib import sha256
+from importlib.metadata import PackageNotFoundError, version
+from json import JSONDecodeError, dump, load, loads
+from logging import Logger, NullHandler, getLogger
+from os import environ, remove, replace
+from os.path import dirname, expanduser, join, splitext
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any
+
+from pypgtable.validators import table_config_validator
+
+_logger: Logger = getLogger(__name__)
+_logger.addHandler(NullHandler())
+
+
+CACHE_FOLDER: str = join(environ.get("XDG_CACHE_HOME", join(expanduser("~"), ".cache")), "egp_worker")
+_FORMATS_FOLDER: str = join(dirname(__file__), "formats")
+
+
+def _pypgtable_version() -> str:
+    """The version of the schema normalizer."""
+    try:
+        return version("pypgtable")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+@lru_cache(maxsize=None)
+def _table_schema(format_file: str) -> dict[str, Any]:
+    """Load the normalized table schema from the disk cache or normalize & cache it."""
+    with open(join(_FORMATS_FOLDER, format_file), "rb") as file_ptr:
+        raw: bytes = file_ptr.read()
+    key: str = sha256(raw + _pypgtable_version().encode()).hexdigest()
+    cache_file: str = join(CACHE_FOLDER, f"{splitext(format_file)[0]}_{key}.json")
+    try:
+        with open(cache_file, "r", encoding="utf8") as file_ptr:
+            return load(file_ptr)
+    except (OSError, JSONDecodeError):
+        pass
+
+    schema: dict[str, Any] = {k: table_config_validator.normalized(v) for k, v in loads(raw).items()}
+    try:
+        Path(CACHE_FOLDER).mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile("w", encoding="utf8", dir=CACHE_FOLDER, suffix=".tmp", delete=False) as tmp_ptr:
+            try:
+                dump(schema, tmp_ptr)
+            except TypeError:
+                tmp_ptr.close()
+                remove(tmp_ptr.name)
+                raise
+        # Atomic so concurrently starting workers never read a partial file
+        replace(tmp_ptr.name, cache_file)
+    except (OSError, TypeError) as error:
+        _logger.info(f"Unable to cache normalized schema {format_file}: {error}")
+    return schema
+
+
+def table_schema(format_file: str) -> dict[str, Any]:
+    """Return the normalized table schema defined in egp_worker/formats/format_file.
+
+    Args
+    ----
+    format_file: The name of the table format file e.g. 'worker_table_format.json'.
+
+    Returns
+    -------
+    A copy of the normalized schema that may be modified by the caller.
+    """
+    return deepcopy(_table_schema(format_file))
@@ -1,14 +1,17 @@
 """Gene pool management for Erasmus GP."""
 
-from gc import collect, disable, enable, freeze, unfreeze
+from ctypes import Array, c_int64
+from gc import collect, disable, enable, freeze, isenabled, unfreeze
 from logging import DEBUG, Logger, NullHandler, getLogger
 from multiprocessing import Process, set_start_method
+from multiprocessing.sharedctypes import RawArray
 from os import kill
-from signal import SIGUSR1, signal
-from time import sleep, time
+from signal import SIG_DFL, SIGKILL, SIGTERM, SIGUSR1, Signals, signal
+from time import perf_counter, sleep, time
 from types import FrameType
-from typing import Literal
+from typing import Any
 from functools import partial
+from random import random
 from numpy import single
 
 from egp_physics.physics import (pGC_fitness, population_GC_evolvability,
@@ -23,6 +26,12 @@ from egp_execution.execution import create_callable
 from psutil import virtual_memory
 from pypgtable import db_disconnect_all
 
+from .egp_typing import AdaptiveGenerationConfigNorm, DrainConfigNorm, EventLogConfigNorm
+from .event_log import event_log
+from .gc_policy import gc_policy
+from .generation_sizer import generation_sizer
+from .telemetry import heartbeat, reporter
+
 
 _logger: Logger = getLogger(__name__)
 _logger.addHandler(NullHandler())
@@ -31,6 +40,7 @@ _LOG_DEBUG: bool = _logger.isEnabledFor(DEBUG)
 
 _MINIMUM_SUBPROCESS_TIME = 60
 _MINIMUM_AVAILABLE_MEMORY = 128 * 1024 * 1024
+_POLL_INTERVAL = 1
 
 
 # Multiprocessing configuration
@@ -39,22 +49,26 @@ set_start_method("fork")
 
 # The self terminate flag.
 # Set by the SIGUSR1 handler to True allowing the sub-process to exit gracefully writing its data
-# to the Gene Pool table when asked.
+# to the Gene Pool table when asked. While evolve() is running SIGTERM also sets the flag in the
+# worker process which drains any sub-processes and exits the worker.
 _TERMINATE = False
-def terminate(_: int, __: FrameType | None) -> None:
+def terminate(signum: int, __: FrameType | None) -> None:
     """Set the self termination flag.
 
-    This is called by the SIGTERM handler.
+    This is called by the SIGUSR1 & SIGTERM handlers.
     """
     global _TERMINATE  # pylint: disable=global-statement
-    _logger.debug("SIGUSR1 received. Setting self terminate flag.")
+    _logger.debug(f"{Signals(signum).name} received. Setting self terminate flag.")
     _TERMINATE = True
 signal(SIGUSR1, terminate)
 
 
-def exit_criteria() -> Literal[False]:
-    """Are we done?"""
-    return False
+def exit_criteria() -> bool:
+    """Are we done?
+
+    True once the worker has been asked to terminate.
+    """
+    return _TERMINATE
 
 
 def pre_evolution_checks() -> None:
@@ -62,48 +76,178 @@ def pre_evolution_checks() -> None:
     # TODO: Implement this function
 
 
-def spawn(p_configs: list[PopulationConfigNorm], g_pool: gene_pool, num_sub_processes: int) -> None:
+def spawn(
+    p_configs: list[PopulationConfigNorm],
+    g_pool: gene_pool,
+    num_sub_processes: int,
+    event_log_config: EventLogConfigNorm | None = None,
+    telemetry: heartbeat | None = None,
+    adaptive_config: AdaptiveGenerationConfigNorm | None = None,
+    stagger_window: float = 0.0,
+    *,
+    drain_config: DrainConfigNorm,
+) -> None:
     """Spawn subprocesses.
 
     Args
     ----
     num_sub_processes (int): Number of sub processes to spawn. If None the number of CPUs-1
                                 will be used.
+    event_log_config (EventLogConfigNorm | None): Generation event log configuration. Each sub-process
+                                writes its own event files.
+    telemetry (heartbeat | None): The worker heartbeat sub-processes report their throughput to. Each
+                                sub-process is given a reporter with its own pipe to the heartbeat,
+                                created just before it is forked so that no other sub-process inherits
+                                the sending end.
+    adaptive_config (AdaptiveGenerationConfigNorm | None): Adaptive active population sizing configuration.
+                                Each sub-process starts its subsets of the active individuals at a
+                                different phase.
+    stagger_window (float): Sub-process starts are spread evenly, with random jitter, over this many
+                                seconds. Every sub-process reconnects to the databases from scratch after
+                                the fork so this spreads the reconnections rather than all landing at once.
+                                0.0 starts all the sub-processes immediately.
+    drain_config (DrainConfigNorm): The drain stage deadlines.
     """
     db_disconnect_all()
     collect()
     disable()
     freeze()
 
-    _entry_point = partial(entry_point, p_configs, g_pool)
-    processes: list[Process] = [Process(target=_entry_point) for _ in range(num_sub_processes)]
+    progress: list["Array[c_int64]"] = [new_progress(len(p_configs)) for _ in range(num_sub_processes)]
+    processes: list[Process] = []
     start: float = time()
-    for p in processes:
+    for idx in range(num_sub_processes):
+        report: reporter | None = telemetry.reporter() if telemetry is not None else None
+        p: Process = Process(
+            target=partial(
+                _sub_process_entry_point,
+                (idx + random()) * stagger_window / num_sub_processes,
+                p_configs,
+                g_pool,
+                event_log_config,
+                report,
+                new_sizer(adaptive_config, (idx + random()) / num_sub_processes),
+                progress[idx],
+            )
+        )
 
         # Sub-processes exit if the parent exits.
         p.daemon = True
         p.start()
+        processes.append(p)
+
+        # The sub-process has its own copy of the reporter pipe
+        if report is not None:
+            report.close()
 
     # Wait for a sub-process to terminate.
-    while all((p.is_alive() for p in processes)) and memory_ok(start):
-        sleep(10)
+    while all((p.is_alive() for p in processes)) and memory_ok(start) and not _TERMINATE:
+        sleep(_POLL_INTERVAL)
+
+    # At least one sub-process is done, we need to reclaim some memory or the worker
+    # has been asked to terminate so drain the running processes
+    drain(processes, drain_config, progress, [p["uid"] for p in p_configs])
+
+    # Re-enable GC
+    unfreeze()
+    enable()
+
+    # TODO: Are we done? Did we run out of sub-process IDs?
+
 
-    # At least one sub-process is done or we need to reclaim some memory
-    # so ask any running processes to finish up
+def _signal_and_wait(processes: list[Process], signum: Signals, timeout: float) -> list[Process]:
+    """Send signum to the running processes & wait up to timeout seconds for them to exit.
+
+    Returns the processes still running.
+    """
     for p in filter(lambda x: x.is_alive(), processes):
         if p.pid is not None:
-            kill(p.pid, SIGUSR1)
+            kill(p.pid, signum)
         else:
             raise RuntimeError('Sub-process has no PID.')
-
+    deadline: float = time() + timeout
     for p in processes:
-        p.join()
+        p.join(max(deadline - time(), 0))
+    return [p for p in processes if p.is_alive()]
 
-    # Re-enable GC
-    unfreeze()
-    enable()
 
-    # TODO: Are we done? Did we run out of sub-process IDs?
+def new_sizer(config: AdaptiveGenerationConfigNorm | None, phase: float) -> generation_sizer | None:
+    """Create a generation sizer starting at phase if adaptive sizing is enabled else None."""
+    return generation_sizer(config, phase) if config is not None and config["enabled"] else None
+
+
+def new_progress(num_populations: int) -> "Array[c_int64]":
+    """Create the progress record shared between a sub-process & the worker process.
+
+    progress[0] is the index of the population being evolved (-1 if none) & progress[1 + i] is the
+    number of generations of population i completed in this epoch. A raw (lock free) array is used
+    so a sub-process killed while updating it cannot leave a lock held.
+    """
+    progress: "Array[c_int64]" = RawArray(c_int64, num_populations + 1)
+    progress[0] = -1
+    return progress
+
+
+def drain(
+    processes: list[Process],
+    config: DrainConfigNorm,
+    progress: "list[Array[c_int64]] | None" = None,
+    uids: list[int] | None = None,
+) -> dict[int, dict[str, Any]]:
+    """Stop the sub-processes with bounded latency.
+
+    Drain stages:
+        1. SIGUSR1: Sub-processes stop taking new work (individuals), push dirty GCs to the
+            Gene Pool & exit. Wait up to config['stop_timeout'] seconds.
+        2. SIGTERM: Sub-processes are terminated. Wait up to config['terminate_timeout'] seconds.
+        3. SIGKILL: Sub-processes are killed. Wait up to config['kill_timeout'] seconds.
+
+    Args
+    ----
+    processes: The sub-processes to drain.
+    config: The drain stage deadlines.
+    progress: The progress record of each sub-process (see new_progress()) in the same order as processes.
+    uids: The UIDs of the populations in the progress records.
+
+    Returns
+    -------
+    A record, by PID, of each sub-process that did not drain cleanly: what stopped it ('stopped_by'),
+    the UID of the population it was evolving ('population') & the generations it completed this
+    epoch by population UID ('generations'). None of its un-pushed GCs were saved.
+    """
+    stopped_by: dict[int, str] = {}
+    running: list[Process] = processes
+    stages: tuple[tuple[Signals, float], ...] = (
+        (SIGUSR1, config["stop_timeout"]),
+        (SIGTERM, config["terminate_timeout"]),
+        (SIGKILL, config["kill_timeout"]),
+    )
+    for signum, timeout in stages:
+        if signum != SIGUSR1:
+            for p in running:
+                _logger.warning(f"Sub-process {p.pid} did not exit in time. Sending {Signals(signum).name}.")
+                stopped_by[p.pid if p.pid is not None else 0] = Signals(signum).name
+        running = _signal_and_wait(running, signum, timeout)
+        if not running:
+            break
+    for p in running:
+        _logger.error(f"Sub-process {p.pid} could not be stopped.")
+        stopped_by[p.pid if p.pid is not None else 0] = "unstopped"
+    for p in processes:
+        if p.exitcode and p.pid not in stopped_by:
+            stopped_by[p.pid if p.pid is not None else 0] = f"exitcode {p.exitcode}"
+
+    lost: dict[int, dict[str, Any]] = {}
+    for idx, p in enumerate(processes):
+        pid: int = p.pid if p.pid is not None else 0
+        if pid in stopped_by:
+            lost[pid] = {"stopped_by": stopped_by[pid], "population": None, "generations": {}}
+            if progress is not None and uids is not None:
+                current: int = progress[idx][0]
+                lost[pid]["population"] = uids[current] if current >= 0 else None
+                lost[pid]["generations"] = {uid: progress[idx][i + 1] for i, uid in enumerate(uids) if progress[idx][i + 1]}
+            _logger.warning(f"Sub-process {pid} did not drain cleanly. Un-pushed GCs were lost: {lost[pid]}")
+    return lost
 
 
 def memory_ok(start: float) -> bool:
@@ -133,10 +277,58 @@ def memory_ok(start: float) -> bool:
     return ok
 
 
-def entry_point(p_configs: list[PopulationConfigNorm], g_pool: gene_pool) -> None:
-    """Entry point for sub-processes."""
-    while not _TERMINATE and any(generation(p_config, g_pool) for p_config in p_configs):
-        pass
+def _sub_process_entry_point(start_delay: float, *args: Any) -> None:
+    """Entry point wrapper for forked sub-processes.
+
+    SIGTERM is restored to its default action in the sub-process so that it can be used
+    to stop a sub-process that does not drain in time. The sub-process waits start_delay
+    seconds before starting (and so reconnecting to the databases).
+    """
+    signal(SIGTERM, SIG_DFL)
+    sleep(start_delay)
+    entry_point(*args)
+
+
+def entry_point(
+    p_configs: list[PopulationConfigNorm],
+    g_pool: gene_pool,
+    event_log_config: EventLogConfigNorm | None = None,
+    report: reporter | None = None,
+    sizer: generation_sizer | None = None,
+    progress: "Array[c_int64] | None" = None,
+) -> None:
+    """Entry point for sub-processes.
+
+    The event log writer thread is created here so that it exists in the sub-process after
+    the fork. If sizer is not None it chooses the active individuals evolved in each generation.
+    The telemetry reporter is closed on exit. When asked to
+    terminate locally modified GCs are pushed to the Gene Pool before exiting. If automatic garbage
+    collection is disabled (as it is in spawned sub-processes) garbage is collected at generation
+    boundaries by a gc_policy. If progress is not None the population being evolved & the generations
+    completed are recorded in it (see new_progress()) so the worker knows what is lost if the
+    sub-process has to be killed.
+    """
+    events: event_log | None = event_log(event_log_config) if event_log_config is not None else None
+    collector: gc_policy | None = None if isenabled() else gc_policy(report)
+
+    def _generation(idx: int, p_config: PopulationConfigNorm) -> bool:
+        if progress is not None:
+            progress[0] = idx
+        evolved: bool = generation(p_config, g_pool, events, report, sizer)
+        if progress is not None:
+            progress[0] = -1
+            progress[idx + 1] += evolved
+        return evolved
+
+    while not _TERMINATE and any(_generation(idx, p_config) for idx, p_config in enumerate(p_configs)):
+        # Generation boundary: the generation's objects are no longer referenced
+        if collector is not None:
+            collector.boundary()
+    g_pool.push()
+    if events is not None:
+        events.close()
+    if report is not None:
+        report.close()
     db_disconnect_all()
 
 
@@ -170,22 +362,81 @@ def viable_individual(individual, population_oih) -> bool:
     return population_oih == individual_oih
 
 
-def generation(p_config: PopulationConfigNorm, g_pool: gene_pool) -> bool:
+def evolve_individual(p_config: PopulationConfigNorm, g_pool: gene_pool, individual, events: event_log | None = None) -> None:
+    """Evolve an individual once and characterise the offspring.
+
+        1. Select a pGC to operate on the individual
+        2. Evolve the individual to produce an offspring
+            TODO: Inheritance
+        3. Characterise the offspring
+        4. Update the individuals (parents) parameters (evolvability, survivability etc.)
+        5. Update the parameters of the pGC (recursively)
+
+    If events is not None the lineage & fitness outcome is recorded in the event log.
+    """
+    pgc: pGC = select_pGC(g_pool, individual)
+    if _LOG_DEBUG:
+        _logger.debug(f"Mutating with pGC {pgc['ref']}")
+
+    wrapped_pgc_exec = create_callable(pgc, g_pool.pool)
+    result = wrapped_pgc_exec((individual,))
+    if result is None:
+        # pGC went pop - should not happen very often
+        _logger.warning(f"pGC {ref_str(pgc['ref'])} threw an exception when called.")
+        offspring = None
+    else:
+        offspring = result[0]
+
+    if _LOG_DEBUG:
+        _logger.debug(f'Offspring: {offspring}')
+
+    if offspring is not None and viable_individual(offspring, p_config['ordered_interface_hash']):
+        offspring_exec = create_callable(offspring, g_pool.pool)
+        offspring['fitness'] = p_config['fitness_function'](offspring_exec)
+        population_GC_inherit(offspring, individual, pgc)
+        delta_fitness = offspring['fitness'] - individual['fitness']
+        # TODO: Arrange so this cast is not needed
+        population_GC_evolvability(individual, delta_fitness)
+    else:
+        # pGC did not produce an offspring.
+        offspring = None
+        delta_fitness: single = single(-1.0)
+    pGC_fitness(g_pool, pgc, individual, delta_fitness)
+    if events is not None:
+        events.record(
+            p_config["uid"],
+            individual["ref"],
+            None if offspring is None else offspring["ref"],
+            pgc["ref"],
+            individual["fitness"],
+            None if offspring is None else offspring["fitness"],
+            delta_fitness,
+        )
+
+
+def generation(
+    p_config: PopulationConfigNorm,
+    g_pool: gene_pool,
+    events: event_log | None = None,
+    report: reporter | None = None,
+    sizer: generation_sizer | None = None,
+) -> bool:
     """Evolve the population one generation and characterise it.
 
     Evolutionary steps are:
         a. Select a population size group of individuals weighted by survivability. Selection
             is from every individual in the local GP cache that is part of the population.
-        b. For each individual:
-            1. Select a pGC to operate on the individual
-            2. Evolve the individual to produce an offspring
-                TODO: Inheritance
-            3. Characterise the offspring
-            4. Update the individuals (parents) parameters (evolvability, survivability etc.)
-            5. Update the parameters of the pGC (recursively)
+        b. Evolve each individual (see evolve_individual()).
         c. Reassess survivability for the entire population in the local cache.
                 TODO: Optimisation mechanisms
 
+    If events is not None the lineage & fitness outcome of each individual is recorded in the event log.
+    If report is not None the generation is counted in the worker telemetry.
+    If sizer is not None only the active individuals it selects are evolved and the generation,
+    including the survivability reassessment, is timed to update its cost estimate.
+    The terminate flag is checked between individuals so that the generation ends early
+    when the process is asked to exit.
+
     Returns True if the population was evolved, False otherwise.
     """
     # TODO: Can optimize how much xGC creation we do here. Append new xGCs to a list and
@@ -198,52 +449,72 @@ def generation(p_config: PopulationConfigNorm, g_pool: gene_pool) -> bool:
         if _LOG_DEBUG:
             _logger.debug(f'Evolving population {p_config["name"]}, UID: {p_config["uid"]}')
 
-        for count, individual in enumerate(active_populus):
-            pgc: pGC = select_pGC(g_pool, individual)
+        start: float = perf_counter()
+        selected = active_populus if sizer is None else sizer.select(p_config['uid'], list(active_populus))
+        evolved: int = 0
+        for individual in selected:
+            if _TERMINATE:
+                break
             if _LOG_DEBUG:
-                _logger.debug(f'Individual ({count + 1}/{len(active_populus)}): {individual}')
-                _logger.debug(f"Mutating with pGC {pgc['ref']}")
-
-            wrapped_pgc_exec = create_callable(pgc, g_pool.pool)
-            result = wrapped_pgc_exec((individual,))
-            if result is None:
-                # pGC went pop - should not happen very often
-                _logger.warning(f"pGC {ref_str(pgc['ref'])} threw an exception when called.")
-                offspring = None
-            else:
-                offspring = result[0]
-
-            if _LOG_DEBUG:
-                _logger.debug(f'Offspring ({count + 1}/{len(active_populus)}): {offspring}')
-
-            if offspring is not None and viable_individual(offspring, p_config['ordered_interface_hash']):
-                offspring_exec = create_callable(offspring, g_pool.pool)
-                offspring['fitness'] = p_config['fitness_function'](offspring_exec)
-                population_GC_inherit(offspring, individual, pgc)
-                delta_fitness = offspring['fitness'] - individual['fitness']
-                # TODO: Arrange so this cast is not needed
-                population_GC_evolvability(individual, delta_fitness)
-            else:
-                # pGC did not produce an offspring.
-                delta_fitness: single = single(-1.0)
-            pGC_fitness(g_pool, pgc, individual, delta_fitness)
+                _logger.debug(f'Individual ({evolved + 1}/{len(selected)}): {individual}')
+            evolve_individual(p_config, g_pool, individual, events)
+            evolved += 1
 
         # Update survivabilities as the population has changed
         if _LOG_DEBUG:
             _logger.debug('Re-characterizing survivability of population.')
         p_config['survivability_function'](populous)
+        if sizer is not None:
+            sizer.update(p_config['uid'], perf_counter() - start, evolved)
+        if report is not None:
+            report.record(p_config["uid"], evolved)
 
         # TODO: Metrics, GC population management
         return True
     return False
 
 
-def evolve(p_configs: list[PopulationConfigNorm], g_pool: gene_pool, num_sub_processes: int = 0) -> None:
-    """Co-evolve the population in pop_list."""
+def evolve(
+    p_configs: list[PopulationConfigNorm],
+    g_pool: gene_pool,
+    num_sub_processes: int = 0,
+    event_log_config: EventLogConfigNorm | None = None,
+    telemetry: heartbeat | None = None,
+    adaptive_config: AdaptiveGenerationConfigNorm | None = None,
+    stagger_window: float = 0.0,
+    *,
+    drain_config: DrainConfigNorm,
+) -> None:
+    """Co-evolve the population in pop_list.
+
+    SIGTERM drains & stops evolution while evolve() is running. The previous SIGTERM handler
+    is restored on return. Only the sub-process starts of the first epoch, which coincide with
+    the worker starting, are staggered over stagger_window seconds.
+    """
     pre_evolution_checks()
-    while not exit_criteria():
-        _logger.info(f'Starting new epoch with {num_sub_processes} sub-processes.')
-        if num_sub_processes > 1:
-            spawn(p_configs, g_pool, num_sub_processes)
-        else:
-            entry_point(p_configs, g_pool)
+    previous_sigterm_handler = signal(SIGTERM, terminate)
+    try:
+        while not exit_criteria():
+            _logger.info(f'Starting new epoch with {num_sub_processes} sub-processes.')
+            if num_sub_processes > 1:
+                spawn(
+                    p_configs,
+                    g_pool,
+                    num_sub_processes,
+                    event_log_config,
+                    telemetry,
+                    adaptive_config,
+                    stagger_window,
+                    drain_config=drain_config,
+                )
+                stagger_window = 0.0
+            else:
+                entry_point(
+                    p_configs,
+                    g_pool,
+                    event_log_config,
+                    telemetry.reporter() if telemetry is not None else None,
+                    new_sizer(adaptive_config, random()),
+                )
+    finally:
+        signal(SIGTERM, previous_sigterm_handler)
@@ -0,0 +1,250 @@
+"""Worker telemetry heartbeat for Erasmus GP.
+
+Evolution processes accumulate per-population generation & evaluation counts and garbage
+collection pauses locally and periodically send them to the worker process over a pipe. Each
+reporter has its own pipe, with a single writer, so a sub-process killed mid-write can only
+damage its own pipe (which the heartbeat then discards) and never the reports of others. A
+heartbeat thread in the worker process aggregates the counts into rates and upserts a single
+row per worker into the worker telemetry table every interval. The first heartbeat is randomly
+phased so that a fleet of workers started together does not update the table in lock step.
+"""
+from logging import DEBUG, Logger, NullHandler, getLogger
+from multiprocessing import Pipe
+from multiprocessing.connection import Connection
+from pickle import UnpicklingError, loads
+from random import uniform
+from threading import Event, Lock, Thread
+from time import monotonic
+from uuid import UUID
+
+from psutil import NoSuchProcess, Process
+from psycopg2 import Error as PsycopgError
+from psycopg2 import connect
+from psycopg2.extensions import connection
+from psycopg2.sql import SQL, Identifier
+from pypgtable.common import connection_str_from_config
+from pypgtable.pypgtable_typing import DatabaseConfigNorm
+
+from .egp_typing import TelemetryConfigNorm
+
+_logger: Logger = getLogger(__name__)
+_logger.addHandler(NullHandler())
+_LOG_DEBUG: bool = _logger.isEnabledFor(DEBUG)
+
+
+_UPSERT_SQL = SQL(
+    "INSERT INTO {table} (worker_id, populations, generations_per_sec, evaluations_per_sec, children, pss, "
+    "gc_collections, gc_pause_time, gc_max_pause, last_seen) "
+    "VALUES (%s::UUID, %s::INT4[], %s::REAL[], %s::REAL[], %s, %s, %s, %s, %s, (NOW() AT TIME ZONE 'UTC')) "
+    "ON CONFLICT (worker_id) DO UPDATE SET populations = EXCLUDED.populations, "
+    "generations_per_sec = EXCLUDED.generations_per_sec, evaluations_per_sec = EXCLUDED.evaluations_per_sec, "
+    "children = EXCLUDED.children, pss = EXCLUDED.pss, gc_collections = EXCLUDED.gc_collections, "
+    "gc_pause_time = EXCLUDED.gc_pause_time, gc_max_pause = EXCLUDED.gc_max_pause, last_seen = EXCLUDED.last_seen"
+)
+
+
+# Report sent from an evolution process to the heartbeat:
+# ({population_uid: (generations, evaluations)}, (gc_collections, gc_pause_time, gc_max_pause))
+Report = tuple[dict[int, tuple[int, int]], tuple[int, float, float]]
+
+
+# A report is a few hundred bytes. A larger length prefix can only come from a damaged pipe.
+_MAX_REPORT_BYTES: int = 1 << 20
+
+
+class reporter:
+    """Evolution process side of the telemetry.
+
+    Counts are accumulated locally and sent to the heartbeat at most once per report interval.
+    Reporters are created by heartbeat.reporter() in the worker process immediately before the
+    sub-process that uses it is forked, so no other sub-process holds the sending end. The worker
+    process must then close() its copy.
+
+    Args
+    ----
+    pipe: The sending end of the pipe to the heartbeat.
+    report_interval: Minimum time in seconds between reports.
+    """
+
+    def __init__(self, pipe: Connection, report_interval: float) -> None:
+        self._pipe: Connection = pipe
+        self._report_interval: float = report_interval
+        self._counts: dict[int, tuple[int, int]] = {}
+        self._gc: tuple[int, float, float] = (0, 0.0, 0.0)
+        self._last_report: float = monotonic()
+
+    def record(self, population_uid: int, evaluations: int) -> None:
+        """Record a generation of the population with evaluations individuals evolved."""
+        generations, total = self._counts.get(population_uid, (0, 0))
+        self._counts[population_uid] = (generations + 1, total + evaluations)
+        if monotonic() - self._last_report > self._report_interval:
+            self.flush()
+
+    def record_gc(self, pause: float) -> None:
+        """Record a garbage collection that paused the process for pause seconds."""
+        collections, pause_time, max_pause = self._gc
+        self._gc = (collections + 1, pause_time + pause, max(max_pause, pause))
+
+    def flush(self) -> None:
+        """Send the accumulated counts to the heartbeat."""
+        if self._counts or self._gc[0]:
+            self._pipe.send((self._counts, self._gc))
+            self._counts = {}
+            self._gc = (0, 0.0, 0.0)
+        self._last_report = monotonic()
+
+    def close(self) -> None:
+        """Send any accumulated counts & close this end of the pipe."""
+        if not self._pipe.closed:
+            self.flush()
+            self._pipe.close()
+
+
+class heartbeat:
+    """Worker process side of the telemetry.
+
+    Args
+    ----
+    worker_id: The worker UUID.
+    db_config: The configuration of the database holding the telemetry table.
+    table_name: The name of the telemetry table.
+    config: The telemetry configuration.
+    """
+
+    def __init__(self, worker_id: UUID, db_config: DatabaseConfigNorm, table_name: str, config: TelemetryConfigNorm) -> None:
+        self._pipes: list[Connection] = []
+        self._pipes_lock: Lock = Lock()
+        self._worker_id: UUID = worker_id
+        self._db_config: DatabaseConfigNorm = db_config
+        self._conn: connection | None = None
+        self._upsert_sql = _UPSERT_SQL.format(table=Identifier(table_name))
+        self._interval: float = config["interval"]
+        self._report_interval: float = config["report_interval"]
+        self._totals: dict[int, tuple[int, int]] = {}
+        self._last_totals: dict[int, tuple[int, int]] = {}
+        self._gc: tuple[int, float, float] = (0, 0.0, 0.0)
+        self._last_beat: float = monotonic()
+        self._stop: Event = Event()
+        self._thread: Thread = Thread(target=self._beat, name="egp_heartbeat", daemon=True)
+
+    def reporter(self) -> reporter:
+        """Create a reporter, with its own pipe to the heartbeat, for an evolution process."""
+        receiver, sender = Pipe(duplex=False)
+        with self._pipes_lock:
+            self._pipes.append(receiver)
+        return reporter(sender, self._report_interval)
+
+    def start(self) -> None:
+        """Start the heartbeat thread."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the heartbeat thread writing a final heartbeat & close the connection."""
+        if self._thread.ident is not None:
+            self._stop.set()
+            self._thread.join()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _connection(self) -> connection:
+        """The heartbeat's own connection to the telemetry database, (re)connected as needed."""
+        if self._conn is None or self._conn.closed:
+            self._conn = connect(connection_str_from_config(self._db_config))
+        return self._conn
+
+    def _drain(self) -> None:
+        """Aggregate the counts reported by the evolution processes.
+
+        Pipes closed by the reporter (or left damaged by a killed sub-process) are discarded.
+        A message truncated by the death of its writer ends in EOF rather than blocking as the
+        writer held the only sending end of the pipe.
+        """
+        with self._pipes_lock:
+            pipes: list[Connection] = list(self._pipes)
+        for pipe in pipes:
+            try:
+                while pipe.poll():
+                    self._aggregate(loads(pipe.recv_bytes(_MAX_REPORT_BYTES)))
+            except (EOFError, OSError, UnpicklingError):
+                pipe.close()
+                with self._pipes_lock:
+                    self._pipes.remove(pipe)
+
+    def _aggregate(self, report: Report) -> None:
+        """Add a report to the totals."""
+        counts, (collections, pause_time, max_pause) = report
+        for uid, (generations, evaluations) in counts.items():
+            total_generations, total_evaluations = self._totals.get(uid, (0, 0))
+            self._totals[uid] = (total_generations + generations, total_evaluations + evaluations)
+        total_collections, total_pause_time, total_max_pause = self._gc
+        self._gc = (total_collections + collections, total_pause_time + pause_time, max(total_max_pause, max_pause))
+
+    def _beat(self) -> None:
+        """Periodically upsert the telemetry."""
+        wait: float = uniform(0.0, self._interval)
+        while not self._stop.wait(wait):
+            self._upsert()
+            wait = self._interval
+        self._upsert()
+
+    def _rates(self) -> tuple[list[int], list[float], list[float]]:
+        """Calculate the generation & evaluation rates of each population since the last heartbeat.
+
+        Returns the population UIDs and their generations & evaluations per second.
+        """
+        now: float = monotonic()
+        duration: float = max(now - self._last_beat, 1e-6)
+        populations: list[int] = sorted(self._totals)
+        generations_per_sec: list[float] = []
+        evaluations_per_sec: list[float] = []
+        for uid in populations:
+            generations, evaluations = self._totals[uid]
+            last_generations, last_evaluations = self._last_totals.get(uid, (0, 0))
+            generations_per_sec.append((generations - last_generations) / duration)
+            evaluations_per_sec.append((evaluations - last_evaluations) / duration)
+        self._last_totals = dict(self._totals)
+        self._last_beat = now
+        return populations, generations_per_sec, evaluations_per_sec
+
+    @staticmethod
+    def _memory() -> tuple[int, int]:
+        """The number of sub-processes & the memory used by the worker and all its sub-processes.
+
+        Sub-processes share the copy-on-write pages inherited from the worker (e.g. the frozen
+        Gene Pool) so their resident set sizes cannot be summed. The proportional set size (PSS)
+        splits each shared page between the processes sharing it and so sums to the total.
+        """
+        this_process: Process = Process()
+        children: list[Process] = this_process.children(recursive=True)
+        pss: int = this_process.memory_full_info().pss
+        for child in children:
+            try:
+                pss += child.memory_full_info().pss
+            except NoSuchProcess:
+                pass
+        return len(children), pss
+
+    def _upsert(self) -> bool:
+        """Calculate the rates since the last heartbeat and write them to the telemetry table.
+
+        Returns True if the telemetry table was updated else False.
+        """
+        self._drain()
+        row: tuple = (str(self._worker_id), *self._rates(), *self._memory(), *self._gc)
+        self._gc = (0, 0.0, 0.0)
+        if _LOG_DEBUG:
+            _logger.debug(f"Heartbeat: {row}")
+        try:
+            conn: connection = self._connection()
+            with conn.cursor() as cursor:
+                cursor.execute(self._upsert_sql, row)
+            conn.commit()
+            return True
+        except PsycopgError as exception:
+            # Telemetry must never take the worker down.
+            _logger.warning(f"Heartbeat failed to update the telemetry table: {exception}")
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            return False
@@ -0,0 +1,85 @@
+"""Unit tests for draining evolution sub-processes."""
+from multiprocessing import Process
+from signal import SIG_IGN, SIGTERM, SIGUSR1, getsignal, signal
+from time import sleep, time
+
+import pytest
+
+from egp_worker import subprocess_evolution
+from egp_worker.egp_typing import DrainConfigNorm
+from egp_worker.subprocess_evolution import drain, new_progress
+
+
+_DRAIN_CONFIG: DrainConfigNorm = {"stop_timeout": 1.0, "terminate_timeout": 1.0, "kill_timeout": 1.0}
+
+
+def _well_behaved() -> None:
+    """Exit when the terminate flag is set."""
+    while not subprocess_evolution._TERMINATE:  # pylint: disable=protected-access
+        sleep(0.01)
+
+
+def _stubborn() -> None:
+    """Ignore requests to terminate."""
+    signal(SIGUSR1, SIG_IGN)
+    signal(SIGTERM, SIG_IGN)
+    while True:
+        sleep(0.01)
+
+
+def test_clean_drain() -> None:
+    """Test sub-processes that honour SIGUSR1 drain without loss."""
+    processes: list[Process] = [Process(target=_well_behaved) for _ in range(2)]
+    for p in processes:
+        p.start()
+    sleep(0.1)
+    assert not drain(processes, _DRAIN_CONFIG)
+    assert not any(p.is_alive() for p in processes)
+
+
+def test_escalated_drain() -> None:
+    """Test a sub-process that ignores SIGUSR1 & SIGTERM is killed within the deadlines."""
+    process: Process = Process(target=_stubborn)
+    process.start()
+    sleep(0.1)
+    start: float = time()
+    lost: dict = drain([process], _DRAIN_CONFIG)
+    assert time() - start < 5
+    assert process.pid is not None
+    assert lost[process.pid]["stopped_by"] == "SIGKILL"
+    assert not process.is_alive()
+
+
+def test_escalated_drain_progress() -> None:
+    """Test the work in progress of a sub-process that had to be killed is recorded."""
+    progress = new_progress(3)
+    progress[0] = 1
+    progress[1] = 4
+    progress[2] = 2
+    process: Process = Process(target=_stubborn)
+    process.start()
+    sleep(0.1)
+    lost: dict = drain([process], _DRAIN_CONFIG, [progress], [10, 11, 12])
+    assert process.pid is not None
+    assert lost[process.pid] == {"stopped_by": "SIGKILL", "population": 11, "generations": {10: 4, 11: 2}}
+
+
+def test_sigterm_handler_scoped(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test SIGTERM is only redirected to the terminate flag while evolve() runs."""
+    assert getsignal(SIGTERM) is not subprocess_evolution.terminate
+    handlers: list = []
+    monkeypatch.setattr(subprocess_evolution, "exit_criteria", lambda: bool(handlers))
+    monkeypatch.setattr(subprocess_evolution, "entry_point", lambda *_: handlers.append(getsignal(SIGTERM)))
+    previous = getsignal(SIGTERM)
+    subprocess_evolution.evolve([], None, drain_config=_DRAIN_CONFIG)  # type: ignore
+    assert handlers == [subprocess_evolution.terminate]
+    assert getsignal(SIGTERM) is previous
+
+
+def test_stagger_first_epoch_only(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test only the sub-process starts of the first epoch are staggered."""
+    stagger_windows: list[float] = []
+    monkeypatch.setattr(subprocess_evolution, "exit_criteria", lambda: len(stagger_windows) == 3)
+    monkeypatch.setattr(subprocess_evolution, "spawn", lambda *args, **_: stagger_windows.append(args[6]))
+    subprocess_evolution.evolve([], None, 2, None, None, None, 5.0, drain_config=_DRAIN_CONFIG)  # type: ignore
+    assert stagger_windows == [5.0, 0.0, 0.0]
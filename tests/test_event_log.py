@@ -0,0 +1,66 @@
+"""Unit tests for the generation event log."""
+from os import listdir
+from os.path import join
+from pathlib import Path
+from time import sleep
+from typing import Any
+
+import pytest
+
+from egp_worker import event_log as event_log_module
+from egp_worker.egp_typing import EventLogConfigNorm
+from egp_worker.event_log import EVENT_COLUMNS, event_log
+
+
+def _config(folder: Path, enabled: bool = True, max_file_size: int = 1024) -> EventLogConfigNorm:
+    """Create an event log configuration for testing."""
+    return {"enabled": enabled, "folder": str(folder), "max_file_size": max_file_size, "buffer_size": 1024, "batch_size": 16}
+
+
+def test_disabled_event_log(tmp_path: Path) -> None:
+    """Test that a disabled event log writes nothing."""
+    events = event_log(_config(tmp_path / "events", False))
+    events.record(1, 2, 3, 4, 1.0, 0.5, -0.5)
+    events.close()
+    assert not (tmp_path / "events").exists()
+
+
+def test_event_log_rotation(tmp_path: Path) -> None:
+    """Test that events are written to rotated Arrow IPC files."""
+    pyarrow_ipc = pytest.importorskip("pyarrow.ipc")
+    events = event_log(_config(tmp_path))
+    for i in range(256):
+        events.record(1, i, None if i % 2 else i + 1, 7, 0.5, None if i % 2 else 0.75, 0.25)
+    events.close()
+    files: list[str] = sorted(listdir(tmp_path))
+    assert len(files) > 1
+    num_events: int = 0
+    for filename in files:
+        with pyarrow_ipc.open_stream(join(tmp_path, filename)) as reader:
+            arrow_table = reader.read_all()
+            assert tuple(arrow_table.column_names) == EVENT_COLUMNS
+            num_events += arrow_table.num_rows
+    assert num_events + events.dropped == 256
+
+
+def test_event_log_write_failure(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that events that cannot be written are counted as lost & the writer carries on."""
+    pytest.importorskip("pyarrow")
+    failures: list[int] = [2]
+    os_file = event_log_module.OSFile
+
+    def _failing_os_file(*args: Any) -> Any:
+        if failures[0]:
+            failures[0] -= 1
+            raise OSError("No space left on device")
+        return os_file(*args)
+
+    monkeypatch.setattr(event_log_module, "OSFile", _failing_os_file)
+    monkeypatch.setattr(event_log_module, "_FLUSH_INTERVAL", 0.0)
+    events = event_log(_config(tmp_path, max_file_size=1 << 20))
+    for i in range(3):
+        events.record(1, i, None, 7, 0.5, None, -1.0)
+        sleep(1.0)
+    events.close()
+    assert events.lost == 2
+    assert len(listdir(tmp_path)) == 1
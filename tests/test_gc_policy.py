@@ -0,0 +1,105 @@
+"""Unit tests for the managed garbage collection policy."""
+from gc import disable, enable, get_count
+
+import pytest
+
+from egp_worker import gc_policy as gc_policy_module
+from egp_worker.gc_policy import gc_policy
+
+
+class _cycle:
+    """An object in a reference cycle."""
+
+    def __init__(self) -> None:
+        self.me: _cycle = self
+
+
+def test_below_threshold() -> None:
+    """Test no collection is made below the threshold."""
+    policy = gc_policy()
+    policy.threshold = get_count()[0] + 1000000
+    assert policy.boundary() == 0.0
+
+
+def test_collection() -> None:
+    """Test garbage is collected at the boundary."""
+    disable()
+    try:
+        policy = gc_policy(target_pause=1.0)
+        policy.threshold = 1000
+        for _ in range(10000):
+            _cycle()
+        assert policy.boundary() > 0.0
+        assert get_count()[0] < 1000
+        assert gc_policy_module._MIN_THRESHOLD <= policy.threshold <= gc_policy_module._MAX_THRESHOLD  # pylint: disable=protected-access
+    finally:
+        enable()
+
+
+def _fake_gc(monkeypatch: pytest.MonkeyPatch, pauses: list[float]) -> list[int]:
+    """Replace the clock & collector so that every 1s interval allocates 8192 objects & collections take pauses."""
+    clock: list[float] = [0.0]
+    collected: list[int] = []
+
+    def _collect(generation: int) -> int:
+        collected.append(generation)
+        clock[0] += pauses[min(len(collected), len(pauses)) - 1]
+        return 0
+
+    def _perf_counter() -> float:
+        return clock[0]
+
+    def _get_count() -> tuple[int, int, int]:
+        clock[0] += 1.0
+        return (8192, 0, 0)
+
+    monkeypatch.setattr(gc_policy_module, "perf_counter", _perf_counter)
+    monkeypatch.setattr(gc_policy_module, "collect", _collect)
+    monkeypatch.setattr(gc_policy_module, "get_count", _get_count)
+    return collected
+
+
+def test_threshold_pause_limited(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the threshold is tuned so that a collection pause is the target."""
+    _fake_gc(monkeypatch, [0.0625])
+    policy = gc_policy(target_pause=0.03125, collection_interval=1.0)
+    policy.threshold = 1000
+    assert policy.boundary() == 0.0625
+    # 0.0625s / 8192 allocations = 2**-17 s per allocation
+    assert policy.threshold == 4096
+
+
+def test_threshold_rate_limited(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the threshold is tuned so that collections are made every collection interval."""
+    _fake_gc(monkeypatch, [0.0625])
+    policy = gc_policy(target_pause=1.0, collection_interval=0.5)
+    policy.threshold = 1000
+    policy.boundary()
+    # 8192 allocations per second
+    assert policy.threshold == 4096
+
+
+def test_middle_collection_tunes_threshold(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a middle collection that overruns the target lowers the threshold."""
+    _fake_gc(monkeypatch, [0.0625] * 9 + [0.25])
+    policy = gc_policy(target_pause=0.25, collection_interval=1000.0)
+    for _ in range(9):
+        policy.threshold = 1000
+        policy.boundary()
+    assert policy.threshold == 8192 * 4
+    policy.threshold = 1000
+    policy.boundary()
+    # 0.25s / 8192 allocations = 2**-15 s per allocation
+    assert policy.threshold == 8192
+
+
+def test_full_collection_deferred(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test a full collection that overran the target defers the next ones."""
+    collected: list[int] = _fake_gc(monkeypatch, [0.0] * 99 + [0.5] + [0.0] * 300)
+    policy = gc_policy(target_pause=0.25)
+    policy.threshold = 1000
+    for _ in range(400):
+        policy.boundary()
+    full: list[int] = [idx for idx, generation in enumerate(collected) if generation == 2]
+    # The first full collection took twice the target so two are deferred
+    assert full == [99, 399]
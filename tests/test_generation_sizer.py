@@ -0,0 +1,104 @@
+"""Unit tests for adaptive active population sizing."""
+from time import sleep
+from typing import Sequence
+
+import pytest
+
+from egp_worker import subprocess_evolution
+from egp_worker.egp_typing import AdaptiveGenerationConfigNorm
+from egp_worker.generation_sizer import generation_sizer
+
+
+def _config(enabled: bool = True) -> AdaptiveGenerationConfigNorm:
+    """Create an adaptive generation configuration for testing."""
+    return {"enabled": enabled, "target_time": 10.0, "min_individuals": 2, "smoothing": 0.5}
+
+
+def test_disabled() -> None:
+    """Test that a disabled sizer evolves all the active individuals."""
+    sizer = generation_sizer(_config(False))
+    sizer.update(1, 100.0, 10)
+    assert sizer.size(1, 1000) == 1000
+
+
+def test_unmeasured() -> None:
+    """Test that the minimum number of individuals are evolved until the cost is known."""
+    sizer = generation_sizer(_config())
+    assert sizer.size(1, 1000) == 2
+    assert sizer.size(1, 1) == 1
+
+
+def test_growth_limited() -> None:
+    """Test that the size at most doubles per generation."""
+    sizer = generation_sizer(_config())
+    sizer.update(1, 0.02, 2)
+    assert sizer.size(1, 1000) == 4
+
+
+def test_shrink() -> None:
+    """Test that slow individuals shrink the generation toward the target time."""
+    sizer = generation_sizer(_config())
+    sizer.update(1, 100.0, 100)
+    assert sizer.size(1, 1000) == 10
+    sizer.update(1, 30.0, 10)
+    assert sizer.size(1, 1000) == 5
+    assert sizer.size(2, 1000) == 2
+
+
+def test_rotation_covers_population() -> None:
+    """Test every active individual is evolved over several generations when the size is limited."""
+    sizer = generation_sizer(_config())
+    individuals: list[int] = list(range(10))
+    evolved: set[int] = set()
+    sizer.update(1, 100.0, 100)
+    sizer.update(1, 30.0, 10)
+    for _ in range(4):
+        selected: Sequence[int] = sizer.select(1, individuals)
+        assert len(selected) < len(individuals)
+        evolved.update(selected)
+        sizer.update(1, 2.0 * len(selected), len(selected))
+    assert evolved == set(individuals)
+
+
+def test_select_all_when_disabled() -> None:
+    """Test a disabled sizer selects every individual."""
+    assert generation_sizer(_config(False)).select(1, [1, 2, 3]) == [1, 2, 3]
+
+
+def test_phase() -> None:
+    """Test sizers with different phases start their windows at different individuals."""
+    individuals: list[int] = list(range(10))
+    first: generation_sizer = generation_sizer(_config(), 0.0)
+    second: generation_sizer = generation_sizer(_config(), 0.5)
+    assert set(first.select(1, individuals)).isdisjoint(second.select(1, individuals))
+
+
+def test_generation_timed_with_survivability(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the survivability reassessment is included in the generation time used for sizing."""
+
+    class _populous(list):
+        """A population of 10 active individuals."""
+
+        def active(self) -> "_populous":
+            """All the individuals are active."""
+            return self
+
+    class _g_pool:  # pylint: disable=too-few-public-methods
+        """A Gene Pool holding a population of 10 individuals."""
+
+        class pool:  # pylint: disable=invalid-name
+            """The Gene Pool cache."""
+
+            @staticmethod
+            def get_population(_: int) -> list[int]:
+                """Get the individuals in the population."""
+                return list(range(10))
+
+    durations: list[float] = []
+    sizer: generation_sizer = generation_sizer(_config())
+    monkeypatch.setattr(sizer, "update", lambda _, duration, __: durations.append(duration))
+    monkeypatch.setattr(subprocess_evolution, "population", _populous)
+    monkeypatch.setattr(subprocess_evolution, "evolve_individual", lambda *_: None)
+    p_config: dict = {"uid": 1, "name": "test", "survivability_function": lambda _: sleep(0.2)}
+    assert subprocess_evolution.generation(p_config, _g_pool(), sizer=sizer)  # type: ignore
+    assert durations[0] >= 0.2
@@ -0,0 +1,35 @@
+"""Unit tests for the normalized table schema cache."""
+from json import load
+from os import listdir
+from os.path import dirname, join
+from pathlib import Path
+
+import pytest
+from pypgtable.validators import table_config_validator
+
+from egp_worker import schema_cache
+from egp_worker.schema_cache import table_schema
+
+
+def test_table_schema_cached(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the normalized schema is cached to disk & matches a fresh normalization."""
+    monkeypatch.setattr(schema_cache, "CACHE_FOLDER", str(tmp_path))
+    schema_cache._table_schema.cache_clear()  # pylint: disable=protected-access
+    with open(join(dirname(__file__), "../egp_worker/formats/worker_table_format.json"), "r", encoding="utf8") as file_ptr:
+        expected = {k: table_config_validator.normalized(v) for k, v in load(file_ptr).items()}
+    assert table_schema("worker_table_format.json") == expected
+    assert len(listdir(tmp_path)) == 1
+
+    # Loaded from disk
+    schema_cache._table_schema.cache_clear()  # pylint: disable=protected-access
+    assert table_schema("worker_table_format.json") == expected
+    assert len(listdir(tmp_path)) == 1
+
+
+def test_table_schema_copy(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test modifying a returned schema does not modify the cache."""
+    monkeypatch.setattr(schema_cache, "CACHE_FOLDER", str(tmp_path))
+    schema_cache._table_schema.cache_clear()  # pylint: disable=protected-access
+    schema = table_schema("worker_table_format.json")
+    schema.clear()
+    assert table_schema("worker_table_format.json")
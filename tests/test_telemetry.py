@@ -0,0 +1,161 @@
+"""Unit tests for the worker telemetry heartbeat."""
+from multiprocessing import Process
+from os import write
+from struct import pack
+from time import sleep
+from uuid import UUID, uuid4
+
+from egp_population.population_config import population_table_default_config
+from psutil import Process as PsProcess
+from psycopg2 import connect
+from pypgtable import table
+from pypgtable.pypgtable_typing import TableConfigNorm
+
+from egp_worker.config_validator import generate_config
+from egp_worker.egp_typing import WorkerConfigNorm
+from egp_worker.schema_cache import table_schema
+from egp_worker.telemetry import heartbeat, reporter
+
+
+def _heartbeat() -> heartbeat:
+    """Create a heartbeat that is not started."""
+    config: WorkerConfigNorm = generate_config()
+    return heartbeat(uuid4(), config["databases"][config["gene_pool"]["database"]], "worker_telemetry", config["telemetry"])
+
+
+def test_reporter_batching() -> None:
+    """Test the reporter only sends counts once per report interval."""
+    beat: heartbeat = _heartbeat()
+    report: reporter = beat.reporter()
+    report.record(1, 10)
+    report.record(1, 10)
+    report.record(2, 5)
+    beat._drain()  # pylint: disable=protected-access
+    assert not beat._totals  # pylint: disable=protected-access
+    report.flush()
+    beat._drain()  # pylint: disable=protected-access
+    assert beat._totals == {1: (2, 20), 2: (1, 5)}  # pylint: disable=protected-access
+
+
+def test_reporter_gc() -> None:
+    """Test garbage collection pauses are aggregated by the heartbeat."""
+    beat: heartbeat = _heartbeat()
+    report: reporter = beat.reporter()
+    report.record_gc(0.25)
+    report.record_gc(0.5)
+    report.flush()
+    beat._drain()  # pylint: disable=protected-access
+    assert beat._gc == (2, 0.75, 0.5)  # pylint: disable=protected-access
+
+
+def test_heartbeat_aggregation() -> None:
+    """Test the heartbeat aggregates the reports of several processes."""
+    beat: heartbeat = _heartbeat()
+    for _ in range(3):
+        report: reporter = beat.reporter()
+        report.record(1, 10)
+        report.flush()
+    beat._drain()  # pylint: disable=protected-access
+    assert beat._totals == {1: (3, 30)}  # pylint: disable=protected-access
+
+
+def test_heartbeat_upsert() -> None:
+    """Test the heartbeat upserts a single row per worker into the telemetry table."""
+    wt_table_config: TableConfigNorm = population_table_default_config()
+    wt_table_config["table"] = "worker_telemetry"
+    wt_table_config["create_db"] = True
+    wt_table_config["delete_table"] = True
+    wt_table_config["create_table"] = True
+    wt_table_config["schema"] = table_schema("worker_telemetry_table_format.json")
+    table(wt_table_config)
+
+    config: WorkerConfigNorm = generate_config()
+    worker_id: UUID = uuid4()
+    beat: heartbeat = heartbeat(worker_id, wt_table_config["database"], wt_table_config["table"], config["telemetry"])
+    report: reporter = beat.reporter()
+    report.record(1, 10)
+    report.record_gc(0.5)
+    report.flush()
+    assert beat._upsert()  # pylint: disable=protected-access
+    report.record(1, 10)
+    report.record(2, 5)
+    report.flush()
+    assert beat._upsert()  # pylint: disable=protected-access
+    beat.stop()
+
+    db_config = wt_table_config["database"]
+    with connect(
+        dbname=db_config["dbname"], host=db_config["host"], port=db_config["port"], user=db_config["user"], password=db_config["password"]
+    ) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT worker_id, populations, evaluations_per_sec, children, pss, gc_collections, gc_max_pause FROM worker_telemetry"
+            )
+            rows = cursor.fetchall()
+    conn.close()
+    assert len(rows) == 1
+    row_worker_id, populations, evaluations_per_sec, children, pss, gc_collections, gc_max_pause = rows[0]
+    assert UUID(str(row_worker_id)) == worker_id
+    assert populations == [1, 2]
+    assert len(evaluations_per_sec) == 2 and all(rate > 0.0 for rate in evaluations_per_sec)
+    assert children >= 0
+    assert pss > 0
+    # GC stats are per heartbeat interval & the second interval had no collections
+    assert gc_collections == 0
+    assert gc_max_pause == 0.0
+
+
+def test_memory_shared_pages_counted_once() -> None:
+    """Test memory shared copy-on-write with a sub-process is not counted twice."""
+    shared: bytearray = bytearray(b"\x01" * (64 << 20))
+    child: Process = Process(target=sleep, args=(10,))
+    child.start()
+    try:
+        sleep(0.5)
+        children, pss = heartbeat._memory()  # pylint: disable=protected-access
+        rss: int = PsProcess().memory_info().rss + PsProcess(child.pid).memory_info().rss
+        assert children == 1
+        assert pss < rss - (len(shared) >> 2)
+    finally:
+        child.kill()
+        child.join()
+
+
+def test_killed_reporter_isolated() -> None:
+    """Test a reporter killed mid-epoch does not affect the reports of others."""
+
+    def _child(report: reporter) -> None:
+        report.record(1, 10)
+        report.flush()
+        sleep(60)
+
+    beat: heartbeat = _heartbeat()
+    killed: reporter = beat.reporter()
+    child: Process = Process(target=_child, args=(killed,))
+    child.start()
+    killed.close()
+    sleep(0.5)
+    child.kill()
+    child.join()
+    survivor: reporter = beat.reporter()
+    survivor.record(2, 5)
+    survivor.close()
+    beat._drain()  # pylint: disable=protected-access
+    assert beat._totals == {1: (1, 10), 2: (1, 5)}  # pylint: disable=protected-access
+    assert not beat._pipes  # pylint: disable=protected-access
+
+
+def test_truncated_report_discarded() -> None:
+    """Test a report truncated by the death of its writer does not block the heartbeat."""
+    beat: heartbeat = _heartbeat()
+    truncated: reporter = beat.reporter()
+    truncated.record(1, 10)
+    truncated.flush()
+    write(truncated._pipe.fileno(), pack("!i", 100) + b"x" * 10)  # pylint: disable=protected-access
+    truncated.close()
+    survivor: reporter = beat.reporter()
+    survivor.record(2, 5)
+    survivor.flush()
+    beat._drain()  # pylint: disable=protected-access
+    assert beat._totals == {1: (1, 10), 2: (1, 5)}  # pylint: disable=protected-access
+    assert len(beat._pipes) == 1  # pylint: disable=protected-access